@@ -0,0 +1,467 @@
+"""
+This module implements a bulk re-encryption pipeline used when rotating RSA keys.
+
+Every ciphertext encrypted under the old key is decrypted with the old private key
+and encrypted again with the new public key. The input file holds one ciphertext
+(an integer, as produced by encrypt_message) per line and is read as a stream.
+Records are grouped in batches that are re-encrypted in a process pool, with a bound
+on the number of batches in flight, and the output file is written in input order.
+
+After each written batch, a checkpoint file records how many records are done and
+how many bytes of output belong to them, so an interrupted run can be resumed by
+running it again with the same arguments. The checkpoint also holds the input file
+and fingerprints of both keys, and a run with different ones refuses to resume it.
+
+A record that cannot be rotated (not an integer, or a message too long for the new
+key) either stops the run with its line number, or is written to a reject file.
+
+Functions:
+- parse_key(key_str): Parses a public key of the form "exponent modulus" as shown by the app.
+- parse_private_key(key_str): Parses a private key "exponent modulus [prime ...]".
+- get_key_fingerprint(key): Returns a short hash identifying a key.
+- read_checkpoint(checkpoint_path): Reads the progress of a previous run.
+- write_checkpoint(checkpoint_path, checkpoint): Saves the progress of a run.
+- read_batches(input_file, batch_size, skip_records): Streams the input records in batches.
+- reencrypt_batch(records, old_private_key, new_public_key):
+	Decrypts a batch with the old key and encrypts it with the new key.
+- RotationOptions: Optional settings of rotate_file, such as the pool and batch sizes.
+- resume_checkpoint(checkpoint_path, run_identity, output_path, reject_path):
+	Returns the checkpoint to continue from and discards the output written after it.
+- reencrypt_in_order(executor, batches, old_private_key, new_public_key, max_in_flight):
+	Re-encrypts the batches in a pool and yields the results in input order.
+- write_batch_results(results, output_file, reject_file, counts, input_path):
+	Writes a re-encrypted batch to the output and reject files.
+- save_checkpoint(checkpoint_path, checkpoint, output_file, reject_file):
+	Flushes the output to disk and saves the progress.
+- rotate_file(input_path, output_path, old_private_key, new_public_key, options):
+	Runs the whole pipeline and reports the throughput in records per second.
+- main(argv): Command line entry point.
+
+Usage:
+    python3 key_rotation.py old_ciphertexts.txt new_ciphertexts.txt
+                            --old-private-key old_private.txt --new-public-key new_public.txt
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from collections import deque, namedtuple
+from contextlib import ExitStack, closing
+from concurrent.futures import ProcessPoolExecutor
+
+from rsa_functionality import encrypt_message, decrypt_message, get_crt_params
+
+def parse_key(key_str):
+    """Parse a key of the form "exponent modulus", as copied from the app.
+
+    Args:
+        key_str (str): the two integers of the key separated by whitespace
+
+    Returns:
+        tuple: (exponent, modulus)
+
+    Raises:
+        ValueError: If the string does not hold exactly two integers.
+    """
+    parts = key_str.split()
+    if len(parts) != 2:
+        raise ValueError("The key must be of the form 'exponent modulus'")
+    exponent_str, modulus_str = parts
+    return int(exponent_str), int(modulus_str)
+
+def parse_private_key(key_str):
+    """Parse a private key of the form "exponent modulus [prime ...]".
+
+    If the primes of the modulus are given (the primes of the CRT parameters
+    returned by generate_keys), the key is returned with its CRT parameters,
+    so that decrypt_message can use the faster CRT decryption.
+
+    Args:
+        key_str (str): the integers of the key separated by whitespace
+
+    Returns:
+        tuple: (exponent, modulus) or (exponent, modulus, crt_params)
+
+    Raises:
+        ValueError: If the string does not hold integers, if only one prime is given,
+                    or if the primes are not distinct or their product is not the modulus.
+    """
+    parts = key_str.split()
+    if len(parts) < 2:
+        raise ValueError("The private key must be of the form 'exponent modulus [prime ...]'")
+    private_exponent, modulus_n, *primes = (int(part) for part in parts)
+    if not primes:
+        return private_exponent, modulus_n
+
+    if len(primes) < 2 or len(set(primes)) != len(primes) or math.prod(primes) != modulus_n:
+        raise ValueError("The primes of the private key must be distinct "
+                         "and their product must be the modulus")
+    return private_exponent, modulus_n, get_crt_params(private_exponent, primes)
+
+def get_key_fingerprint(key):
+    """Return a short hash identifying a key, without storing the key itself.
+
+    Only the exponent and modulus are used, so a private key has the same
+    fingerprint with and without its CRT parameters.
+
+    Args:
+        key (tuple): public or private key, (exponent, modulus, ...)
+
+    Returns:
+        str: the first 16 hexadecimal digits of the SHA-256 hash of the key
+    """
+    exponent, modulus = key[:2]
+    return hashlib.sha256(f"{exponent} {modulus}".encode("utf-8")).hexdigest()[:16]
+
+def read_checkpoint(checkpoint_path):
+    """Read the progress saved by a previous run.
+
+    Args:
+        checkpoint_path (str): path of the checkpoint file
+
+    Returns:
+        dict: the saved checkpoint, or None if there is no checkpoint
+    """
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, encoding="utf-8") as file:
+        return json.load(file)
+
+def write_checkpoint(checkpoint_path, checkpoint):
+    """Save the progress of the run.
+
+    The checkpoint is written to a temporary file first and then renamed,
+    so an interruption never leaves a half written checkpoint behind.
+
+    Args:
+        checkpoint_path (str): path of the checkpoint file
+        checkpoint (dict): the records done, the output and reject file sizes holding
+                           them, and the input file and key fingerprints of the run
+    """
+    temporary_path = checkpoint_path + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        json.dump(checkpoint, file)
+    os.replace(temporary_path, checkpoint_path)
+
+def read_batches(input_file, batch_size, skip_records=0):
+    """Stream the records of the input file in batches.
+
+    Blank lines are not records and are ignored.
+
+    Args:
+        input_file (file): open text file with one ciphertext per line
+        batch_size (int): number of records per batch
+        skip_records (int): number of records at the start of the file to skip
+
+    Yields:
+        list: up to batch_size (line number, ciphertext string) tuples
+    """
+    batch = []
+    for line_number, line in enumerate(input_file, start=1):
+        record = line.strip()
+        if not record:
+            continue
+        if skip_records > 0:
+            skip_records -= 1
+            continue
+        batch.append((line_number, record))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def reencrypt_batch(records, old_private_key, new_public_key):
+    """Decrypt a batch of ciphertexts with the old key and encrypt them with the new key.
+
+    A record that cannot be rotated does not stop the batch, its error is returned instead.
+
+    Args:
+        records (list): (line number, ciphertext string) tuples under the old key
+        old_private_key (tuple): private key the ciphertexts were encrypted for
+        new_public_key (tuple): public key to encrypt the messages with
+
+    Returns:
+        list: (line number, ciphertext string, new ciphertext string or None,
+               error message or None) tuples, in the same order
+    """
+    results = []
+    for line_number, ciphertext in records:
+        try:
+            message = decrypt_message(int(ciphertext), old_private_key)
+            new_ciphertext = str(encrypt_message(message, new_public_key))
+            results.append((line_number, ciphertext, new_ciphertext, None))
+        except (TypeError, ValueError) as err_message:
+            results.append((line_number, ciphertext, None, str(err_message)))
+    return results
+
+RotationOptions = namedtuple(
+    "RotationOptions",
+    ["checkpoint_path", "reject_path", "workers", "batch_size", "max_in_flight", "progress"],
+    defaults=[None, None, None, 100, None, None])
+RotationOptions.__doc__ = """Optional settings of rotate_file.
+
+    checkpoint_path (str): checkpoint file, output_path + ".checkpoint" if None
+    reject_path (str): file for the records that cannot be rotated, as
+                       "line number<TAB>ciphertext<TAB>error" lines. If None,
+                       the first such record stops the run.
+    workers (int): number of worker processes, the CPU count if None
+    batch_size (int): number of records sent to a worker at once
+    max_in_flight (int): maximum number of batches submitted but not yet written,
+                         2 * workers if None
+    progress (callable): called as progress(records_done, records_per_s)
+                         after each written batch
+"""
+
+def resume_checkpoint(checkpoint_path, run_identity, output_path, reject_path):
+    """Return the checkpoint to continue from, truncating the files written after it.
+
+    Args:
+        checkpoint_path (str): checkpoint file of the run
+        run_identity (dict): input file and key fingerprints the checkpoint must match
+        output_path (str): output file of the run
+        reject_path (str): reject file of the run, or None
+
+    Returns:
+        dict: the checkpoint, a new one if there is no checkpoint file
+
+    Raises:
+        ValueError: If the checkpoint belongs to a different input file or key,
+                    or if the output or reject file is shorter than its checkpoint says.
+    """
+    checkpoint = read_checkpoint(checkpoint_path)
+    if checkpoint is None:
+        return {"records_done": 0, "output_bytes": 0, "reject_bytes": 0, **run_identity}
+
+    for field, value in run_identity.items():
+        if checkpoint.get(field) != value:
+            raise ValueError(f"The checkpoint {checkpoint_path} was made with a different "
+                             f"{field.replace('_', ' ')}, refusing to resume. Remove it "
+                             f"to start the rotation again.")
+    for path, size_field in [(output_path, "output_bytes"), (reject_path, "reject_bytes")]:
+        if path is None or not os.path.exists(path) and checkpoint[size_field] == 0:
+            continue
+        if not os.path.exists(path) or os.path.getsize(path) < checkpoint[size_field]:
+            raise ValueError(f"The file {path} is shorter than "
+                             f"its checkpoint {checkpoint_path}")
+        # drop whatever was written after the last checkpoint
+        os.truncate(path, checkpoint[size_field])
+    return checkpoint
+
+def reencrypt_in_order(executor, batches, old_private_key, new_public_key, max_in_flight):
+    """Re-encrypt the batches in the pool and yield their results in input order.
+
+    Batches are only read from the input when fewer than max_in_flight of them are
+    submitted but not yet yielded, so the memory use does not grow with the file.
+    Closing the generator cancels the batches that have not started yet.
+
+    Args:
+        executor (Executor): pool running reencrypt_batch
+        batches (iterator): batches of records, as yielded by read_batches
+        old_private_key (tuple): private key the ciphertexts were encrypted for
+        new_public_key (tuple): public key to encrypt the messages with
+        max_in_flight (int): maximum number of batches submitted but not yet yielded
+
+    Yields:
+        list: the results of reencrypt_batch for each batch
+    """
+    in_flight = deque()
+    try:
+        while True:
+            for batch in batches:
+                in_flight.append(executor.submit(reencrypt_batch, batch,
+                                                 old_private_key, new_public_key))
+                if len(in_flight) >= max_in_flight:
+                    break
+            if not in_flight:
+                return
+            yield in_flight.popleft().result()
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+def write_batch_results(results, output_file, reject_file, counts, input_path):
+    """Write the results of a batch to the output and reject files, in input order.
+
+    Args:
+        results (list): tuples returned by reencrypt_batch
+        output_file (file): binary output file for the new ciphertexts
+        reject_file (file): binary reject file, or None to stop at the first failed record
+        counts (dict): "records", "rejected" and "records_done" counts,
+                       updated with every written record
+        input_path (str): input file of the records, for the error message
+
+    Raises:
+        ValueError: If a record cannot be rotated and there is no reject file.
+                    The records before it are written.
+    """
+    for line_number, ciphertext, new_ciphertext, error in results:
+        if error is None:
+            output_file.write(f"{new_ciphertext}\n".encode("utf-8"))
+            counts["records"] += 1
+        elif reject_file is not None:
+            reject_file.write(f"{line_number}\t{ciphertext}\t{error}\n".encode("utf-8"))
+            counts["rejected"] += 1
+        else:
+            raise ValueError(f"Line {line_number} of {input_path} cannot be rotated: {error}")
+        counts["records_done"] += 1
+
+def save_checkpoint(checkpoint_path, checkpoint, output_file, reject_file):
+    """Flush the output and reject files to disk and record their sizes in the checkpoint.
+
+    Args:
+        checkpoint_path (str): checkpoint file of the run
+        checkpoint (dict): progress of the run, updated with the file sizes
+        output_file (file): binary output file
+        reject_file (file): binary reject file, or None
+    """
+    for file in (output_file, reject_file):
+        if file is not None:
+            file.flush()
+            os.fsync(file.fileno())
+    checkpoint["output_bytes"] = output_file.tell()
+    if reject_file is not None:
+        checkpoint["reject_bytes"] = reject_file.tell()
+    write_checkpoint(checkpoint_path, checkpoint)
+
+def rotate_file(input_path, output_path, old_private_key, new_public_key, options=None):
+    """Re-encrypt every ciphertext of the input file under the new key.
+
+    If a checkpoint of an interrupted run exists, the output written after the
+    last checkpoint is discarded and the run continues from there.
+    The checkpoint is removed once the whole file has been rotated.
+
+    Args:
+        input_path (str): file with one ciphertext under the old key per line
+        output_path (str): file for the ciphertexts under the new key, in input order
+        old_private_key (tuple): private key of the old key pair, with CRT parameters
+                                 if available (see parse_private_key)
+        new_public_key (tuple): public key of the new key pair
+        options (RotationOptions): checkpoint and reject files, pool size, batch size,
+                                   batches in flight and progress callback,
+                                   the defaults of RotationOptions if None
+
+    Returns:
+        dict: {"records": records rotated by this run, "rejected": records rejected by
+               this run, "records_done": total input records handled, "seconds":
+               elapsed time, "records_per_s": throughput}
+
+    Raises:
+        ValueError: If batch_size or max_in_flight are not positive, if the checkpoint
+                    belongs to a different input file or key, if the output file is
+                    shorter than its checkpoint says, or if a record cannot be rotated
+                    and there is no reject file. The message gives the line number.
+    """
+    options = options or RotationOptions()
+    if options.checkpoint_path is None:
+        options = options._replace(checkpoint_path=output_path + ".checkpoint")
+    if options.workers is None:
+        options = options._replace(workers=os.cpu_count() or 1)
+    if options.max_in_flight is None:
+        options = options._replace(max_in_flight=2 * options.workers)
+    if options.batch_size < 1 or options.max_in_flight < 1:
+        raise ValueError("Batch size and maximum batches in flight must be at least 1")
+
+    checkpoint = resume_checkpoint(options.checkpoint_path, {
+        "input_path": os.path.abspath(input_path),
+        "input_size": os.path.getsize(input_path),
+        "old_key": get_key_fingerprint(old_private_key),
+        "new_key": get_key_fingerprint(new_public_key),
+    }, output_path, options.reject_path)
+
+    summary = {"records": 0, "rejected": 0, "records_done": checkpoint["records_done"]}
+    start = time.perf_counter()
+    output_mode = "ab" if checkpoint["records_done"] > 0 else "wb"
+    with open(input_path, encoding="utf-8") as input_file, \
+            open(output_path, output_mode) as output_file, \
+            ProcessPoolExecutor(max_workers=options.workers) as executor, \
+            ExitStack() as stack:
+        # entered after the pool, so that closing the batches cancels the pending
+        # ones before the pool waits for them
+        reject_file = (stack.enter_context(open(options.reject_path, output_mode))
+                       if options.reject_path is not None else None)
+        for results in stack.enter_context(closing(reencrypt_in_order(
+                executor, read_batches(input_file, options.batch_size, checkpoint["records_done"]),
+                old_private_key, new_public_key, options.max_in_flight))):
+            try:
+                write_batch_results(results, output_file, reject_file, summary, input_path)
+            finally:
+                # also keep the records written before a record that cannot be rotated
+                checkpoint["records_done"] = summary["records_done"]
+                save_checkpoint(options.checkpoint_path, checkpoint, output_file, reject_file)
+
+            if options.progress is not None:
+                options.progress(summary["records_done"],
+                                 summary["records"] / (time.perf_counter() - start))
+
+    summary["seconds"] = time.perf_counter() - start
+    if os.path.exists(options.checkpoint_path):
+        os.remove(options.checkpoint_path)
+
+    summary["records_per_s"] = (summary["records"] / summary["seconds"]
+                                if summary["seconds"] > 0 else 0.0)
+    return summary
+
+def main(argv=None):
+    """Parse the command line arguments and run the key rotation.
+
+    Args:
+        argv (list): command line arguments, sys.argv[1:] if None
+    """
+    parser = argparse.ArgumentParser(
+        description="Re-encrypt a file of ciphertexts from an old key pair to a new one.")
+    parser.add_argument("input", help="file with one ciphertext under the old key per line")
+    parser.add_argument("output", help="file for the ciphertexts under the new key")
+    parser.add_argument("--old-private-key", required=True,
+                        help="file holding the old private key as 'exponent modulus', "
+                             "optionally followed by its primes for faster CRT decryption")
+    parser.add_argument("--new-public-key", required=True,
+                        help="file holding the new public key as 'exponent modulus'")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument("--reject-file",
+                        help="file for records that cannot be rotated "
+                             "(default: stop at the first such record)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=100,
+                        help="records per batch (default: 100)")
+    parser.add_argument("--max-in-flight", type=int,
+                        help="maximum batches in flight (default: 2 * workers)")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.old_private_key, encoding="utf-8") as file:
+            old_private_key = parse_private_key(file.read())
+        with open(args.new_public_key, encoding="utf-8") as file:
+            new_public_key = parse_key(file.read())
+    except (OSError, ValueError) as err_message:
+        parser.error(str(err_message))
+
+    def show_progress(records_done, records_per_s):
+        print(f"\r{records_done} records done, {records_per_s:.1f} records/s",
+              end="", file=sys.stderr)
+
+    try:
+        summary = rotate_file(args.input, args.output, old_private_key, new_public_key,
+                              RotationOptions(checkpoint_path=args.checkpoint,
+                                              reject_path=args.reject_file,
+                                              workers=args.workers,
+                                              batch_size=args.batch_size,
+                                              max_in_flight=args.max_in_flight,
+                                              progress=show_progress))
+    except (OSError, ValueError) as err_message:
+        print(file=sys.stderr)
+        parser.exit(1, f"Error: {err_message}\n")
+
+    print(file=sys.stderr)
+    print(f"Rotated {summary['records']} records in {summary['seconds']:.2f} s "
+          f"({summary['records_per_s']:.1f} records/s), "
+          f"{summary['records_done']} records of {args.input} done"
+          + (f", {summary['rejected']} rejected to {args.reject_file}."
+             if args.reject_file else "."))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+This module implements a load generation and soak test harness for the RSA
+functions of rsa_functionality.py.
+
+Several workers (threads or processes) call `generate_keys`, `encrypt_message`
+and `decrypt_message` concurrently, following a configurable request mix, until
+the chosen duration has passed. For each operation the harness reports the
+p50/p95/p99 latency, the throughput and the CPU time used. The peak memory (RSS)
+can only be read for a whole process, so it is reported for the whole run and,
+in processes mode, for each worker. The results can be used to size hardware
+and to catch performance regressions.
+
+The worker pool is started before the measurement begins, and each worker runs
+for the chosen duration from the moment it starts, so process startup is not
+counted in the latency or throughput.
+
+Functions:
+- parse_mix(mix_str): Parses a request mix such as "encrypt_message=5,decrypt_message=5".
+- percentile(values, percent): Returns the nearest-rank percentile of a list of values.
+- get_peak_rss_kb(): Returns the peak resident memory of the current process.
+- warm_up_worker(): Does nothing, used to start the workers before the measurement.
+- run_worker(mix, bits, prime_count, keys, ciphertext, duration):
+	Calls the RSA functions following the mix for duration seconds and records the results.
+- run_load_test(mix, concurrency, duration, mode, bits, prime_count):
+	Runs the workers concurrently and aggregates their results.
+- main(argv): Command line entry point, writes the results as JSON.
+
+Usage:
+    python3 load_test.py --mode processes --concurrency 4 --duration 30 --output results.json
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from rsa_functionality import generate_keys, encrypt_message, decrypt_message
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+OPERATIONS = ("generate_keys", "encrypt_message", "decrypt_message")
+DEFAULT_MIX = "generate_keys=1,encrypt_message=10,decrypt_message=10"
+MESSAGE = "Test message for RSA encryption"
+
+def parse_mix(mix_str):
+    """Parse a request mix of the form "operation=weight,operation=weight".
+
+    Args:
+        mix_str (str): comma separated operations with their relative weights
+
+    Returns:
+        dict: operation name (str) -> weight (float)
+
+    Raises:
+        ValueError: If an operation is unknown, a weight is negative or not a number,
+                    or if all of the weights are zero.
+    """
+    mix = {}
+    for entry in mix_str.split(","):
+        operation, _, weight_str = entry.strip().partition("=")
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation {operation!r}, "
+                             f"expected one of {', '.join(OPERATIONS)}")
+        weight = float(weight_str) if weight_str else 1.0
+        if weight < 0:
+            raise ValueError(f"Weight of {operation} must be positive, got {weight}")
+        mix[operation] = weight
+
+    if sum(mix.values()) <= 0:
+        raise ValueError("At least one operation must have a weight above 0")
+    return mix
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of a list of values.
+
+    Args:
+        values (list): numbers to take the percentile of
+        percent (float): percentile between 0 and 100
+
+    Returns:
+        float: the percentile value, 0.0 if values is empty
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(percent * len(ordered) / 100), 1)
+    return ordered[rank - 1]
+
+def get_peak_rss_kb():
+    """Return the peak resident set size (RSS) of the current process in kilobytes.
+
+    The value only grows during the life of the process, so it cannot tell apart
+    the memory used by the different operations run in it.
+
+    Returns:
+        int: peak RSS in kilobytes, or None if the platform does not provide it
+    """
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":  # macOS reports bytes instead of kilobytes
+        peak_rss //= 1024
+    return peak_rss
+
+def warm_up_worker():
+    """Do nothing, so that submitting it starts a worker before the measurement.
+
+    Returns:
+        float: time.time() of the worker
+    """
+    return time.time()
+
+def run_worker(mix, bits, prime_count, keys, ciphertext, duration):
+    """Call the RSA functions following the request mix for a given duration.
+
+    Args:
+        mix (dict): operation name -> weight, as returned by parse_mix
+        bits (int): key size used by generate_keys
+        prime_count (int): number of primes used by generate_keys
+        keys (tuple): (public_key, private_key) used by encrypt and decrypt
+        ciphertext (int): ciphertext used by decrypt_message
+        duration (float): seconds, counted from the start of the worker,
+                          after which no new request is started
+
+    Returns:
+        dict: {"operations": operation name -> {"latencies": list of seconds,
+                                                "cpu_seconds": float},
+               "cpu_seconds": CPU time of the whole worker loop,
+               "peak_rss_kb": peak RSS of the worker process, or None}
+    """
+    public_key, private_key = keys
+    calls = {
+        "generate_keys": lambda: generate_keys(bits, prime_count=prime_count),
+        "encrypt_message": lambda: encrypt_message(MESSAGE, public_key),
+        "decrypt_message": lambda: decrypt_message(ciphertext, private_key),
+    }
+    operations = list(mix)
+    weights = [mix[operation] for operation in operations]
+    results = {operation: {"latencies": [], "cpu_seconds": 0.0} for operation in operations}
+
+    system_random = random.SystemRandom()
+    worker_cpu_start = time.thread_time()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        operation = system_random.choices(operations, weights)[0]
+        cpu_start = time.thread_time()
+        start = time.perf_counter()
+        calls[operation]()
+        latency = time.perf_counter() - start
+
+        result = results[operation]
+        result["latencies"].append(latency)
+        result["cpu_seconds"] += time.thread_time() - cpu_start
+
+    return {
+        "operations": results,
+        "cpu_seconds": time.thread_time() - worker_cpu_start,
+        "peak_rss_kb": get_peak_rss_kb(),
+    }
+
+def run_load_test(mix, concurrency=4, duration=10.0, mode="threads", bits=1024, prime_count=2):
+    """Run the RSA functions concurrently and report latency, throughput, CPU and memory.
+
+    Args:
+        mix (dict): operation name -> weight, as returned by parse_mix
+        concurrency (int): number of threads or processes sending requests
+        duration (float): seconds during which new requests are started
+        mode (str): "threads" or "processes"
+        bits (int): key size used for all of the operations
+        prime_count (int): number of primes used by generate_keys
+
+    The peak RSS is only reported in the "overall" summary: the peak of the
+    whole process in threads mode, the largest worker peak in processes mode,
+    where the peak of each worker is also listed in "worker_peak_rss_kb".
+
+    Returns:
+        dict: the configuration, an "overall" summary and a summary per operation
+
+    Raises:
+        ValueError: If the mode is unknown, or concurrency or duration are not positive.
+    """
+    if mode not in ("threads", "processes"):
+        raise ValueError(f"Mode must be 'threads' or 'processes', got {mode!r}")
+    if concurrency < 1:
+        raise ValueError(f"Concurrency must be at least 1, got {concurrency}")
+    if duration <= 0:
+        raise ValueError(f"Duration must be positive, got {duration}")
+
+    keys = generate_keys(bits, prime_count=prime_count)
+    ciphertext = encrypt_message(MESSAGE, keys[0])
+    executor_class = ThreadPoolExecutor if mode == "threads" else ProcessPoolExecutor
+
+    with executor_class(max_workers=concurrency) as executor:
+        # start (and for processes, import) every worker before measuring
+        warm_up_futures = [executor.submit(warm_up_worker) for _ in range(concurrency)]
+        for future in warm_up_futures:
+            future.result()
+
+        start = time.perf_counter()
+        futures = [executor.submit(run_worker, mix, bits, prime_count, keys, ciphertext, duration)
+                   for _ in range(concurrency)]
+        worker_results = [future.result() for future in futures]
+        wall_seconds = time.perf_counter() - start
+
+    operations = {}
+    for operation in mix:
+        latencies = []
+        op_cpu_seconds = 0.0
+        for worker_result in worker_results:
+            result = worker_result["operations"][operation]
+            latencies.extend(result["latencies"])
+            op_cpu_seconds += result["cpu_seconds"]
+
+        operations[operation] = {
+            "requests": len(latencies),
+            "throughput_per_s": len(latencies) / wall_seconds,
+            "latency_s": {
+                "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": max(latencies, default=0.0),
+            },
+            "cpu_seconds": op_cpu_seconds,
+            "cpu_percent": 100 * op_cpu_seconds / wall_seconds,
+        }
+
+    cpu_seconds = sum(worker_result["cpu_seconds"] for worker_result in worker_results)
+    if mode == "threads":
+        worker_peak_rss = None
+        peak_rss = get_peak_rss_kb()
+    else:
+        worker_peak_rss = [worker_result["peak_rss_kb"] for worker_result in worker_results]
+        peak_rss = max((value for value in worker_peak_rss if value is not None), default=None)
+    total_requests = sum(summary["requests"] for summary in operations.values())
+    return {
+        "config": {
+            "mix": mix,
+            "concurrency": concurrency,
+            "duration_s": duration,
+            "mode": mode,
+            "bits": bits,
+            "prime_count": prime_count,
+        },
+        "overall": {
+            "wall_seconds": wall_seconds,
+            "requests": total_requests,
+            "throughput_per_s": total_requests / wall_seconds,
+            "cpu_seconds": cpu_seconds,
+            "cpu_percent": 100 * cpu_seconds / wall_seconds,
+            "peak_rss_kb": peak_rss,
+            "worker_peak_rss_kb": worker_peak_rss,
+        },
+        "operations": operations,
+    }
+
+def main(argv=None):
+    """Parse the command line arguments, run the load test and write the JSON results.
+
+    Args:
+        argv (list): command line arguments, sys.argv[1:] if None
+    """
+    parser = argparse.ArgumentParser(description="Load and soak test of the RSA functions.")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"request mix as operation=weight pairs (default: {DEFAULT_MIX})")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="number of concurrent workers (default: 4)")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="seconds to keep sending requests (default: 10)")
+    parser.add_argument("--mode", choices=("threads", "processes"), default="threads",
+                        help="run the workers as threads or processes (default: threads)")
+    parser.add_argument("--bits", type=int, default=1024,
+                        help="key size in bits (default: 1024)")
+    parser.add_argument("--prime-count", type=int, default=2,
+                        help="number of primes per key (default: 2)")
+    parser.add_argument("--output", help="JSON file for the results (default: stdout)")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+        results = run_load_test(mix, args.concurrency, args.duration,
+                                args.mode, args.bits, args.prime_count)
+    except ValueError as err_message:
+        parser.error(str(err_message))
+
+    for operation, summary in results["operations"].items():
+        latency = summary["latency_s"]
+        print(f"{operation}: {summary['requests']} requests, "
+              f"{summary['throughput_per_s']:.1f} req/s, p50 {1000 * latency['p50']:.3f} ms, "
+              f"p95 {1000 * latency['p95']:.3f} ms, p99 {1000 * latency['p99']:.3f} ms",
+              file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,9 @@ and uses these primes to create RSA public and private key pairs.
 Default keys are set to 1024 bits, but the setting can be changed:
 - more bits: better security / longer computing
 - key bit size = 2 * bit size of the prime numbers (if both are 512 bits, key = 1024)
+- multi-prime keys (3 primes from 1024 bits, 4 from 4096 bits) are faster to generate and
+  to decrypt with; any key can carry the Chinese Remainder Theorem (CRT)
+  parameters that speed up decryption
 
 Functions:
 - generate_n_bit_random(bit_length): Generates a random number of specified bit length.
@@ -15,11 +18,19 @@ Functions:
 - is_miller_rabin_passed(candidate_prime):
 Determines if a number is likely prime using the Miller-Rabin test.
 - generate_prime(bits): Generates a prime number with a specified number of bits.
-- generate_keys(): Generates RSA public and private keys.
+- gen_safe_prime_candidate(bit_length):
+	Generates a pair (p, q) with p = 2q + 1 where neither is divisible by the first few primes.
+- generate_safe_prime(bits): Generates a safe prime p = 2q + 1 with q also prime.
+- get_max_prime_count(bits): Returns the maximum number of primes for a key size.
+- get_crt_params(private_exponent, primes): Computes the CRT parameters of a private key.
+- generate_keys(bits, safe_primes, prime_count, include_crt):
+	Generates RSA public and private keys.
 - encrypt_message(message, public_key): Encrypts a message using the RSA public key.
+- decrypt_with_crt(ciphertext, crt_params): Decrypts a ciphertext with the CRT parameters.
 - decrypt_message(ciphertext, private_key): Decrypts a message using the RSA private key.
 """
 
+import math
 import random
 
 # Pre-generated list of small primes to test divisibility for initial prime candidacy checks
@@ -137,20 +148,126 @@ def generate_prime(bits):
         if is_miller_rabin_passed(prime_candidate):
             return prime_candidate
 
-def generate_keys(bits):
+def gen_safe_prime_candidate(bit_length):
+    """Generate a safe prime candidate pair sieved against the first primes.
+
+    Both p = 2q + 1 and q are checked against the same small primes table
+    in one pass, so a candidate failing either condition is dropped before
+    any modular exponentiation is done.
+
+    Args:
+        bit_length (int): bit size of the safe prime candidate p
+
+    Returns:
+        tuple: (p, q) where p = 2q + 1 and neither is divisible by the first arbitrary primes
+    """
+
+    while True:
+        sophie_candidate = generate_n_bit_random(bit_length - 1)
+        safe_candidate = 2 * sophie_candidate + 1
+        for divisor in FIRST_PRIMES_LIST:
+            if sophie_candidate % divisor == 0 and divisor**2 <= sophie_candidate:
+                break
+            if safe_candidate % divisor == 0 and divisor**2 <= safe_candidate:
+                break
+        else:
+            return safe_candidate, sophie_candidate
+
+def generate_safe_prime(bits):
+    """Generate a safe prime (p = 2q + 1 with q prime) with a given number of bits.
+
+    The Miller-Rabin test is run on q first, as it is the smaller of the two
+    numbers, and p is only tested once q has passed.
+
+    Args:
+        bits (int): bit size of safe prime number to be generated
+
+    Returns:
+        int: a safe prime number with specified bit size
+
+    Raises:
+        TypeError: If `bits` is not an integer.
+        ValueError: If `bits` is less than 9.
+    """
+    if isinstance(bits, int) is not True:
+        raise TypeError("Bit size must be an integer.")
+
+    if bits < 9:
+        raise ValueError(f"Bit size must be at least 9 to form "
+                         f"a valid safe prime, got {bits}")
+
+    while True:
+        safe_candidate, sophie_candidate = gen_safe_prime_candidate(bits)
+        if not is_miller_rabin_passed(sophie_candidate):
+            continue
+        if is_miller_rabin_passed(safe_candidate):
+            return safe_candidate
+
+def get_max_prime_count(bits):
+    """Return the maximum number of primes allowed for a key size.
+
+    The primes of a multi-prime key are smaller, which makes them easier to find
+    with the elliptic curve method (ECM) of factoring. To keep ECM no faster than
+    factoring the whole modulus, the commonly recommended limits (also used by
+    OpenSSL) are 2 primes below 1024 bits, 3 primes below 4096 bits, 4 primes
+    below 8192 bits and 5 primes above.
+
+    Args:
+        bits (int): bit size of the key
+
+    Returns:
+        int: maximum number of primes
+    """
+    if bits < 1024:
+        return 2
+    if bits < 4096:
+        return 3
+    if bits < 8192:
+        return 4
+    return 5
+
+def get_crt_params(private_exponent, primes):
+    """Compute the CRT parameters used by decrypt_message for a private key.
+
+    Args:
+        private_exponent (int): private exponent d of the key
+        primes (list): the distinct primes whose product is the modulus
+
+    Returns:
+        tuple: (prime, d mod (prime - 1), inverse of the product of the
+               previous primes modulo prime) for each prime, in order
+    """
+    crt_params = []
+    for index, prime in enumerate(primes):
+        crt_exponent = private_exponent % (prime - 1)
+        crt_coefficient = pow(math.prod(primes[:index]), -1, prime)
+        crt_params.append((prime, crt_exponent, crt_coefficient))
+    return tuple(crt_params)
+
+def generate_keys(bits, safe_primes=False, prime_count=2, include_crt=False):
     """Generate a pair of RSA keys.
 
     Args:
         bits (int): bit sizes of keys
+        safe_primes (bool): if True, the modulus is built from safe primes
+                            (p = 2q + 1 with q prime). Slower to generate.
+        prime_count (int): number of primes the modulus is built from, at most
+                           get_max_prime_count(bits). Multi-prime keys always
+                           hold the CRT parameters used by decrypt_message.
+        include_crt (bool): if True, two-prime keys hold the CRT parameters too.
 
     Returns:
         tuple: A tuple containing the RSA keys:
             - (public_exponent, modulus_n): Public key components.
-            - (private_exponent, modulus_n): Private key components.
+            - (private_exponent, modulus_n): Private key components, or
+              (private_exponent, modulus_n, crt_params) for multi-prime keys and
+              with include_crt, where crt_params is returned by get_crt_params.
 
     Raises:
-        TypeError: If `bits` is not an integer.
-        ValueError: If `bits` is less than 8.
+        TypeError: If `bits` or `prime_count` is not an integer.
+        ValueError: If `prime_count` is less than 2 or more than get_max_prime_count(bits),
+                    or if `bits` leaves less than 8 bits per prime (9 with safe primes),
+                    e.g. if `bits` is less than 16 for the default two primes.
     """
     public_exponent = 65537  # Common choice for public exponent
     if isinstance(bits, int) is not True:
@@ -159,22 +276,52 @@ def generate_keys(bits):
     if bits < 8:
         raise ValueError(f"Bit size must be at least 8 to form "
                          f"a valid value for the keys, got {bits}")
+
+    if isinstance(prime_count, int) is not True:
+        raise TypeError("Prime count must be an integer.")
+
+    if prime_count < 2:
+        raise ValueError(f"Prime count must be at least 2, got {prime_count}")
+
+    min_prime_bits = 9 if safe_primes else 8
+    if bits < min_prime_bits * prime_count:
+        raise ValueError(f"Bit size must be at least {min_prime_bits * prime_count} to form "
+                         f"valid keys from {prime_count} "
+                         f"{'safe primes' if safe_primes else 'primes'}, got {bits}")
+
+    max_prime_count = get_max_prime_count(bits)
+    if prime_count > max_prime_count:
+        raise ValueError(f"Prime count must be at most {max_prime_count} for "
+                         f"{bits} bit keys to resist ECM factoring, got {prime_count}")
+
+    prime_generator = generate_safe_prime if safe_primes else generate_prime
     while True:
-        #ensure bit length of modulus as desired
-        while True:
-            prime_p = generate_prime(bits // 2) # e.g. for a 1024 bit key size
-            prime_q = generate_prime(bits // 2) # each prime needs to be 512 bits
+        # e.g. for a 1024 bit key size with 2 primes, each prime needs to be 512 bits
+        primes = [prime_generator(bits // prime_count) for _ in range(prime_count - 1)]
+        partial_modulus = math.prod(primes)
 
-            modulus_n = prime_p * prime_q
+        # the last prime fills the remaining bits, so only it is regenerated
+        # until the bit length of the modulus is as desired
+        while True:
+            last_prime = prime_generator(bits - partial_modulus.bit_length())
+            modulus_n = partial_modulus * last_prime
             if modulus_n.bit_length() == bits:
                 break
+        primes.append(last_prime)
 
-        phi_n = (prime_p - 1) * (prime_q - 1)
+        if len(set(primes)) != prime_count:
+            continue
+
+        phi_n = math.prod(prime - 1 for prime in primes)
         if phi_n % public_exponent != 0:
             break
 
     private_exponent = pow(public_exponent, -1, phi_n)
-    return (public_exponent, modulus_n), (private_exponent, modulus_n)
+    if prime_count == 2 and not include_crt:
+        return (public_exponent, modulus_n), (private_exponent, modulus_n)
+
+    return ((public_exponent, modulus_n),
+            (private_exponent, modulus_n, get_crt_params(private_exponent, primes)))
 
 def encrypt_message(message, public_key):
     """
@@ -221,25 +368,53 @@ def encrypt_message(message, public_key):
     ciphertext = pow(message_int, public_exponent, modulus_n)
     return ciphertext
 
+def decrypt_with_crt(ciphertext, crt_params):
+    """
+    Decrypt a ciphertext with the CRT parameters of a private key (Garner's method).
+
+    Each prime only needs an exponentiation with a smaller exponent and modulus
+    than the full private key, and the results are recombined into the message.
+
+    Args:
+        ciphertext (int): The encrypted ciphertext to be decrypted.
+        crt_params (tuple): (prime, exponent, coefficient) for each prime,
+                            as returned by get_crt_params.
+
+    Returns:
+        int: The decrypted message as an integer.
+    """
+    message_int = 0
+    partial_modulus = 1
+    for prime, crt_exponent, crt_coefficient in crt_params:
+        residue = pow(ciphertext, crt_exponent, prime)
+        step = (residue - message_int) * crt_coefficient % prime
+        message_int += partial_modulus * step
+        partial_modulus *= prime
+    return message_int
+
 def decrypt_message(ciphertext, private_key):
     """
     Decrypt a ciphertext using the RSA private key.
 
     Args:
         ciphertext (int): The encrypted ciphertext to be decrypted.
-        private_key (tuple): A tuple containing the RSA private key components (d, n):
+        private_key (tuple): A tuple containing the RSA private key components (d, n)
+                             or (d, n, crt_params) for keys with CRT parameters:
                             - d (int): Private exponent.
                             - n (int): Modulus.
+                            - crt_params (tuple): (prime, exponent, coefficient)
+                              for each of at least two primes, as returned by generate_keys.
 
     Returns:
         str: The decrypted message.
 
     Raises:
         TypeError: If `ciphertext` is not an integer or if `private_key`
-                   is not a tuple of two integers.
+                   is not a tuple of two integers and optional CRT parameters.
         ValueError: If `ciphertext` is empty or consists only of whitespace,
-                    or if the decrypted message bit length is
-                    greater than or equal to the modulus bit length.
+                    if the decrypted message bit length is
+                    greater than or equal to the modulus bit length,
+                    or if the primes of the CRT parameters do not multiply to the modulus.
     """
 
     string_cipher = str(ciphertext)
@@ -247,12 +422,24 @@ def decrypt_message(ciphertext, private_key):
     if len(string_cipher) <= 0 or str.isspace(string_cipher):
         raise TypeError("Message must be non-empty.")
 
-    if not isinstance(private_key, tuple) or len(private_key) != 2:
-        raise TypeError("The public key must be a tuple of two integers (e, n)")
+    if not isinstance(private_key, tuple) or len(private_key) not in (2, 3):
+        raise TypeError("The private key must be a tuple of two integers (d, n) "
+                        "and optional CRT parameters")
 
-    private_exponent, modulus_n = private_key
+    private_exponent, modulus_n = private_key[:2]
     if not (isinstance(private_exponent, int) and isinstance(modulus_n, int)):
-        raise TypeError("Both public exponent and modulus must be integers")
+        raise TypeError("Both private exponent and modulus must be integers")
+
+    crt_params = private_key[2] if len(private_key) == 3 else None
+    if crt_params is not None:
+        if len(crt_params) < 2 or not all(
+                isinstance(param, tuple) and len(param) == 3
+                and all(isinstance(value, int) for value in param)
+                for param in crt_params):
+            raise TypeError("CRT parameters must be at least two tuples of three integers "
+                            "(prime, exponent, coefficient)")
+        if math.prod(prime for prime, _, _ in crt_params) != modulus_n:
+            raise ValueError("The primes of the CRT parameters must multiply to the modulus")
 
     modulus_bit_length = modulus_n.bit_length()
     message_bit_length = int(ciphertext).bit_length()
@@ -267,6 +454,9 @@ def decrypt_message(ciphertext, private_key):
                          f"with the given key ({modulus_bit_length}) bits. "
                          f"Please either reduce the message size or use a bigger key.")
 
-    message_int = pow(ciphertext, private_exponent, modulus_n)
+    if crt_params is None:
+        message_int = pow(ciphertext, private_exponent, modulus_n)
+    else:
+        message_int = decrypt_with_crt(ciphertext, crt_params)
     message = message_int.to_bytes((message_int.bit_length() + 7) // 8, 'big').decode('utf-8')
     return message
\ No newline at end of file
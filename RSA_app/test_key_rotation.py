@@ -0,0 +1,178 @@
+"""
+This module contains unit tests for the bulk re-encryption pipeline of the file key_rotation.py
+
+The tests cover:
+- Parsing of keys in the "exponent modulus" format used by the app, and of
+private keys followed by their primes for CRT decryption.
+- Streaming of the input records in batches, skipping already rotated records.
+- A full rotation, checking that the output is in input order and decrypts
+with the new key to the original messages.
+- Resuming an interrupted rotation from its checkpoint, and refusing to resume
+with a different key.
+- Malformed input records, either stopping the run with their line number
+or written to a reject file.
+
+Example:
+    python3 -m unittest test_key_rotation.py
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from rsa_functionality import generate_keys, encrypt_message, decrypt_message
+from key_rotation import (
+    parse_key,
+    parse_private_key,
+    read_batches,
+    read_checkpoint,
+    rotate_file,
+    RotationOptions
+)
+
+class TestKeyRotation(unittest.TestCase):
+    """Unit tests for the key rotation pipeline."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.old_public_key, cls.old_private_key = generate_keys(1024, prime_count=3)
+        cls.new_public_key, cls.new_private_key = generate_keys(256)
+        cls.messages = [f"record number {index}" for index in range(50)]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input_path = os.path.join(self.directory, "old.txt")
+        self.output_path = os.path.join(self.directory, "new.txt")
+        with open(self.input_path, "w", encoding="utf-8") as file:
+            for message in self.messages:
+                file.write(f"{encrypt_message(message, self.old_public_key)}\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_input_line(self, line_index, text):
+        """Replace one line of the input file with the given text."""
+        with open(self.input_path, encoding="utf-8") as file:
+            lines = file.readlines()
+        lines[line_index] = f"{text}\n"
+        with open(self.input_path, "w", encoding="utf-8") as file:
+            file.writelines(lines)
+
+    def read_output_messages(self):
+        """Decrypt the output file with the new private key."""
+        with open(self.output_path, encoding="utf-8") as file:
+            return [decrypt_message(int(line), self.new_private_key) for line in file]
+
+    def test_parse_key(self):
+        """
+        Test that keys copied from the app are parsed and malformed keys are rejected.
+        """
+        self.assertEqual(parse_key("65537 99991\n"), (65537, 99991))
+        with self.assertRaises(ValueError):
+            parse_key("65537")
+        with self.assertRaises(ValueError):
+            parse_key("65537 text")
+
+        private_exponent, modulus_n, crt_params = self.old_private_key
+        primes = " ".join(str(prime) for prime, _, _ in crt_params)
+        self.assertEqual(parse_private_key(f"{private_exponent} {modulus_n}"),
+                         (private_exponent, modulus_n))
+        self.assertEqual(parse_private_key(f"{private_exponent} {modulus_n} {primes}"),
+                         self.old_private_key)
+        with self.assertRaises(ValueError):
+            parse_private_key(f"{private_exponent} {modulus_n} {crt_params[0][0]}")
+        with self.assertRaises(ValueError):
+            parse_private_key(f"{private_exponent} {modulus_n} 3 5 7")
+
+    def test_read_batches(self):
+        """
+        Test that records are streamed in batches, ignoring blank lines and skipped records.
+        """
+        input_file = io.StringIO("1\n2\n\n3\n4\n5\n")
+        self.assertEqual(list(read_batches(input_file, 2)),
+                         [[(1, "1"), (2, "2")], [(4, "3"), (5, "4")], [(6, "5")]])
+
+        input_file = io.StringIO("1\n2\n\n3\n4\n5\n")
+        self.assertEqual(list(read_batches(input_file, 2, skip_records=3)),
+                         [[(5, "4"), (6, "5")]])
+
+    def test_rotate_file(self):
+        """
+        Test a full rotation with several workers and a bounded number of batches in flight.
+        """
+        progress = []
+        summary = rotate_file(self.input_path, self.output_path,
+                              self.old_private_key, self.new_public_key,
+                              RotationOptions(workers=2, batch_size=7, max_in_flight=2,
+                                              progress=lambda done, _: progress.append(done)))
+
+        self.assertEqual(summary["records"], len(self.messages))
+        self.assertEqual(summary["records_done"], len(self.messages))
+        self.assertGreater(summary["records_per_s"], 0)
+        self.assertEqual(progress, sorted(progress))
+        self.assertEqual(self.read_output_messages(), self.messages)
+        self.assertFalse(os.path.exists(self.output_path + ".checkpoint"),
+                         "The checkpoint should be removed after a full rotation")
+
+    def test_resume_rotation(self):
+        """
+        Test that an interrupted rotation resumes from its checkpoint.
+
+        The rotation is interrupted after 14 records, and a partly written
+        batch is added to the output, which has to be discarded when the rotation resumes.
+        A checkpoint made with a different key must not be resumed.
+        """
+        def interrupt(records_done, _):
+            if records_done >= 14:
+                raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            rotate_file(self.input_path, self.output_path,
+                        self.old_private_key, self.new_public_key,
+                        RotationOptions(workers=2, batch_size=7, progress=interrupt))
+        self.assertEqual(read_checkpoint(self.output_path + ".checkpoint")["records_done"], 14)
+        with open(self.output_path, "ab") as file:
+            file.write(b"12345")
+
+        with self.assertRaises(ValueError):
+            rotate_file(self.input_path, self.output_path,
+                        self.old_private_key, self.old_public_key,
+                        RotationOptions(workers=2, batch_size=5))
+
+        summary = rotate_file(self.input_path, self.output_path,
+                              self.old_private_key, self.new_public_key,
+                              RotationOptions(workers=2, batch_size=5))
+
+        self.assertEqual(summary["records"], len(self.messages) - 14)
+        self.assertEqual(summary["records_done"], len(self.messages))
+        self.assertEqual(self.read_output_messages(), self.messages)
+
+    def test_malformed_record(self):
+        """
+        Test that a malformed record stops the run with its line number, keeping the
+        records before it, or is written to the reject file when one is given.
+        """
+        self.write_input_line(9, "not a ciphertext")
+
+        with self.assertRaisesRegex(ValueError, "Line 10 "):
+            rotate_file(self.input_path, self.output_path,
+                        self.old_private_key, self.new_public_key,
+                        RotationOptions(workers=2, batch_size=4))
+        self.assertEqual(read_checkpoint(self.output_path + ".checkpoint")["records_done"], 9)
+        self.assertEqual(self.read_output_messages(), self.messages[:9])
+
+        reject_path = os.path.join(self.directory, "rejected.txt")
+        summary = rotate_file(self.input_path, self.output_path,
+                              self.old_private_key, self.new_public_key,
+                              RotationOptions(workers=2, batch_size=4, reject_path=reject_path))
+
+        self.assertEqual(summary["rejected"], 1)
+        self.assertEqual(summary["records_done"], len(self.messages))
+        self.assertEqual(self.read_output_messages(), self.messages[:9] + self.messages[10:])
+        with open(reject_path, encoding="utf-8") as file:
+            line_number, record, _ = file.read().rstrip("\n").split("\t")
+        self.assertEqual((line_number, record), ("10", "not a ciphertext"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+This module contains unit tests for the load generation harness of the file load_test.py
+
+The tests cover:
+- Parsing of the request mix and rejection of invalid mixes.
+- The nearest-rank percentile used for the latency report.
+- Short load test runs with threads and with processes, checking that every
+operation of the mix is reported and that the results can be written as JSON.
+- Invalid command line options, reported as usage errors.
+
+Example:
+    python3 -m unittest test_load_test.py
+"""
+
+import contextlib
+import io
+import json
+import unittest
+from load_test import main, parse_mix, percentile, run_load_test
+
+class TestLoadTest(unittest.TestCase):
+    """Unit tests for the load generation and soak test harness."""
+
+    def test_parse_mix(self):
+        """
+        Test that request mixes are parsed into weights and invalid mixes are rejected.
+        """
+        self.assertEqual(parse_mix("encrypt_message=3,decrypt_message=1"),
+                         {"encrypt_message": 3.0, "decrypt_message": 1.0})
+        self.assertEqual(parse_mix("generate_keys"), {"generate_keys": 1.0})
+
+        with self.assertRaises(ValueError):
+            parse_mix("sign_message=1")
+        with self.assertRaises(ValueError):
+            parse_mix("encrypt_message=-1")
+        with self.assertRaises(ValueError):
+            parse_mix("encrypt_message=0")
+
+    def test_percentile(self):
+        """
+        Test the nearest-rank percentile on known values.
+        """
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_run_load_test(self):
+        """
+        Test short load test runs in both modes.
+
+        Validates that every operation in the mix is reported with its
+        latencies in increasing percentile order, that the peak RSS is only reported
+        for the whole run and per worker process, and that the results are JSON serializable.
+        """
+        mix = parse_mix("generate_keys=1,encrypt_message=5,decrypt_message=5")
+        for mode in ["threads", "processes"]:
+            results = run_load_test(mix, concurrency=2, duration=0.5, mode=mode, bits=256)
+
+            self.assertEqual(set(results["operations"]), set(mix))
+            self.assertGreater(results["overall"]["requests"], 0)
+            for summary in results["operations"].values():
+                latency = summary["latency_s"]
+                self.assertLessEqual(latency["p50"], latency["p95"])
+                self.assertLessEqual(latency["p95"], latency["p99"])
+                self.assertLessEqual(latency["p99"], latency["max"])
+                self.assertNotIn("peak_rss_kb", summary)
+            worker_peak_rss = results["overall"]["worker_peak_rss_kb"]
+            if mode == "processes":
+                self.assertEqual(len(worker_peak_rss), 2)
+            else:
+                self.assertIsNone(worker_peak_rss)
+            json.dumps(results)
+
+        with self.assertRaises(ValueError):
+            run_load_test(mix, mode="fibers")
+        with self.assertRaises(ValueError):
+            run_load_test(mix, concurrency=0)
+
+    def test_main_invalid_options(self):
+        """
+        Test that invalid options exit with a usage error instead of a traceback.
+        """
+        for argv in [["--concurrency", "0"], ["--duration", "0"], ["--mode", "fibers"],
+                     ["--mix", "sign_message=1"], ["--bits", "512", "--prime-count", "7"]]:
+            with self.subTest(argv=argv), contextlib.redirect_stderr(io.StringIO()) as stderr:
+                with self.assertRaises(SystemExit) as context:
+                    main(argv)
+                self.assertEqual(context.exception.code, 2)
+                self.assertIn("error:", stderr.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,8 @@ and key generation of the file rsa_functionality.py
 The tests cover several core components of an RSA module which includes:
 - Generating random integers with a specified bit length.
 - Generating prime number candidates and verifying their primality using the Miller-Rabin test.
-- Generating RSA key pairs (public and private keys).
+- Generating safe primes (p = 2q + 1) with a combined sieve on p and q.
+- Generating RSA key pairs (public and private keys), including multi-prime keys.
 - Encrypting and decrypting messages using RSA keys.
 - Input validation across various functions to ensure robustness against
 incorrect data types and values.
@@ -37,6 +38,9 @@ from rsa_functionality import (
     is_miller_rabin_passed,
     generate_keys,
     generate_prime,
+    gen_safe_prime_candidate,
+    generate_safe_prime,
+    get_max_prime_count,
     encrypt_message,
     decrypt_message
 )
@@ -131,6 +135,47 @@ class TestRSAGeneration(unittest.TestCase):
             self.assertFalse(is_miller_rabin_passed(prime * another_prime),
                              f"{prime * another_prime} should not be considered prime")
 
+    def test_gen_safe_prime_candidate(self):
+        """
+        Test the generation of safe prime candidate pairs.
+
+        Validates that p = 2q + 1, that p has the correct bit length and that neither
+        p nor q is divisible by any small prime number up to its square root.
+        """
+        for bit in BITS:
+            safe_candidate, sophie_candidate = gen_safe_prime_candidate(bit)
+            self.assertEqual(safe_candidate, 2 * sophie_candidate + 1)
+            self.assertEqual(safe_candidate.bit_length(), bit,
+                             f"Failed for bit length: {bit}. Number has "
+                             f"{safe_candidate.bit_length()} bits instead of {bit} bits.")
+            for number in (safe_candidate, sophie_candidate):
+                self.assertFalse(
+                    any(number % p == 0 for p in FIRST_PRIMES_LIST if p**2 <= number),
+                    "Generated number is divisible by one of the first primeslist"
+                )
+
+    def test_generate_safe_prime(self):
+        """Test the safe prime number generation.
+
+        Ensures that the generated safe prime p has the correct bit length and
+        that both p and (p - 1) / 2 pass the Miller-Rabin primality test.
+        """
+        for bit in [16, 128, 256]:
+            prime = generate_safe_prime(bit)
+            self.assertEqual(prime.bit_length(), bit,
+                             f"{prime} should have {bit} bits")
+            self.assertTrue(is_miller_rabin_passed(prime),
+                            f"{prime} should be prime")
+            self.assertTrue(is_miller_rabin_passed((prime - 1) // 2),
+                            f"{(prime - 1) // 2} should be prime")
+
+        public_key, private_key = generate_keys(256, safe_primes=True)
+        self.assertEqual(public_key[1].bit_length(), 256)
+        message = "Safe prime keys"
+        encrypted = encrypt_message(message, public_key)
+        self.assertEqual(decrypt_message(encrypted, private_key), message,
+                         "Decrypted message does not match the original")
+
     def test_encryption_decryption(self):
         """
         Test the RSA encryption and decryption processes.
@@ -208,6 +253,46 @@ class TestRSAGeneration(unittest.TestCase):
                             f"The private exponent is more or less than"
                             f"{desired_bit} bits by {abs(diff_bits)} bits.")
 
+    def test_multi_prime_keys(self):
+        """
+        Test multi-prime RSA key generation and CRT decryption.
+
+        Validates that the modulus has the requested bit size and is the product of
+        distinct primes, that the CRT parameters match the private exponent, and that
+        decryption with CRT gives the same result as decryption without it.
+        Two-prime keys are tested with include_crt, and 4 primes with a 4096 bit key.
+        """
+        message = "Multi-prime message"
+        for prime_count, bit in [(2, 256), (2, 1024), (3, 1024), (4, 4096)]:
+            with self.subTest(prime_count=prime_count, bit=bit):
+                public_key, private_key = generate_keys(bit, prime_count=prime_count,
+                                                        include_crt=True)
+                _, modulus_n = public_key
+                private_exponent, private_modulus, crt_params = private_key
+
+                self.assertEqual(modulus_n, private_modulus)
+                self.assertEqual(modulus_n.bit_length(), bit,
+                                 f"Modulus n is not {bit} bits in length")
+                self.assertEqual(len(crt_params), prime_count)
+
+                primes = [prime for prime, _, _ in crt_params]
+                self.assertEqual(len(set(primes)), prime_count, "Primes should be distinct")
+                product = 1
+                for prime, crt_exponent, crt_coefficient in crt_params:
+                    self.assertTrue(is_miller_rabin_passed(prime),
+                                    f"{prime} should be prime")
+                    self.assertEqual(crt_exponent, private_exponent % (prime - 1))
+                    self.assertEqual(crt_coefficient * product % prime, 1)
+                    product *= prime
+                self.assertEqual(product, modulus_n)
+
+                encrypted = encrypt_message(message, public_key)
+                self.assertEqual(decrypt_message(encrypted, private_key), message,
+                                 "CRT decrypted message does not match the original")
+                self.assertEqual(decrypt_message(encrypted, (private_exponent, modulus_n)),
+                                 message,
+                                 "Decrypted message does not match the original")
+
     def test_input_validations(self):
         """
         Test input validation for various RSA functions
@@ -229,6 +314,29 @@ class TestRSAGeneration(unittest.TestCase):
         with self.assertRaises(TypeError):
             generate_keys(39.5)
 
+        with self.assertRaises(ValueError):
+            generate_keys(16, safe_primes=True)
+
+        with self.assertRaises(ValueError):
+            generate_keys(1024, prime_count=1)
+        with self.assertRaises(ValueError):
+            generate_keys(16, prime_count=3)
+        with self.assertRaises(TypeError):
+            generate_keys(1024, prime_count="3")
+        with self.assertRaises(ValueError):
+            generate_keys(2048, prime_count=4) # too many primes against ECM factoring
+        self.assertEqual([get_max_prime_count(bit) for bit in [512, 1024, 4096, 8192]],
+                         [2, 3, 4, 5])
+        with self.assertRaises(ValueError):
+            generate_keys(512, prime_count=3) # too many primes against ECM factoring
+        with self.assertRaises(ValueError):
+            generate_keys(12) # less than 8 bits per prime
+
+        with self.assertRaises(ValueError):
+            generate_safe_prime(8)
+        with self.assertRaises(TypeError):
+            generate_safe_prime("text")
+
         with self.assertRaises(ValueError):
             generate_n_bit_random(-1)
         with self.assertRaises(TypeError):
@@ -258,6 +366,12 @@ class TestRSAGeneration(unittest.TestCase):
             decrypt_message("text1", ("text2", "text3")) # Non-int key
         with self.assertRaises(TypeError, msg="Encrypt and decrypt should fail on inproper input"):
             decrypt_message("", (65537, 99991)) # Empty string
+        with self.assertRaises(TypeError, msg="Encrypt and decrypt should fail on inproper input"):
+            decrypt_message(12345, (65537, 99991, ((3, 1),))) # Malformed CRT parameters
+        with self.assertRaises(TypeError, msg="Encrypt and decrypt should fail on inproper input"):
+            decrypt_message(12345, (65537, 99991, ())) # Empty CRT parameters
+        with self.assertRaises(ValueError, msg="Decrypt should fail on CRT primes not matching n"):
+            decrypt_message(12345, (65537, 99991, ((3, 1, 1), (5, 1, 2)))) # 3 * 5 != 99991
 
 #30.06.24: coverage report 95%
 